@@ -0,0 +1,102 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+MAXSIZE = 256
+TTL = 60  # seconds
+
+
+class QueryCache:
+    """ read-through cache of query results
+    The key is the database plus the SQL text plus the parameters. Every result remembers the tables it was read from,
+    and a write into a table removes all the results of this table (invalidation).
+    The oldest unused results are removed when there are more than maxsize of them (LRU),
+    and any result is not older than ttl seconds.
+    """
+
+    def __init__(self, maxsize=MAXSIZE, ttl=TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires, rows, tables)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._version = 0  # changes on every invalidate
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return list(item[1])
+
+    def put(self, key, rows, tables, version=None):
+        with self._lock:
+            # the rows were read before a write that happened meanwhile - they can be stale
+            if version is not None and version != self._version:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, tuple(rows), frozenset(tables))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def fetchall(self, cur, sql, parameters=(), tables=()):
+        """ return the rows from the cache or execute the query with the cursor and remember them """
+        database = database_key(cur.connection)
+        if database is None:
+            cur.execute(sql, parameters)
+            return cur.fetchall()
+        key = (database, sql, tuple(parameters))
+        rows = self.get(key)
+        if rows is None:
+            version = self._version
+            cur.execute(sql, parameters)
+            rows = cur.fetchall()
+            self.put(key, rows, tables, version)
+        return rows
+
+    def invalidate(self, *tables):
+        """ forget all the results read from the tables, call it after a write """
+        tables = set(tables)
+        with self._lock:
+            self._version += 1
+            for key in [key for key, item in self._data.items() if item[2] & tables]:
+                del self._data[key]
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._data),
+            }
+
+
+def database_key(conn):
+    """ the file of the main database of the connection, None for an in-memory database
+    An in-memory database has no file to tell it from the others, so its results are not cached
+    (it is fast anyway, and a replica reader can be older than the file).
+    """
+    # a plain cursor: with an instrumented connection this PRAGMA is not counted as a query
+    path = sqlite3.Cursor(conn).execute("PRAGMA database_list").fetchone()[2]
+    return path or None
+
+
+# one cache for the helpers of select.py, seed.py, update.py and delete.py
+query_cache = QueryCache()
@@ -1,13 +1,78 @@
+import atexit
 import sqlite3
+import threading
 from contextlib import contextmanager
 
 database = './conspectus/databases/accessing_a_database_with_Python/example/test.db'
 
-@contextmanager
-def create_connection(db_file):
-    """ create a database connection to a SQLite database """
-    conn = sqlite3.connect(db_file)
-    yield conn
-    conn.rollback()
-    conn.close()
+# negative cache_size is in KiB: 64 MiB of page cache, and up to 256 MiB of the file is read through mmap
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA cache_size=-65536;",
+    "PRAGMA mmap_size=268435456;",
+    "PRAGMA busy_timeout=5000;",
+)
+
+# instrumentation.enable() replaces it with a connection class that records the statements
+connection_factory = sqlite3.Connection
+
+_local = threading.local()
+_connections = []
+_lock = threading.Lock()
+_generation = 0
+
+
+def get_connection(db_file):
+    """ return the long-lived connection of this thread to db_file, it is opened once """
+    # after close_connections the connections of every thread are opened again
+    if getattr(_local, 'generation', None) != _generation:
+        _local.connections = {}
+        _local.generation = _generation
+    connections = _local.connections
+
+    conn = connections.get(db_file)
+    if conn is None:
+        # check_same_thread=False only to be able to close all the connections at exit
+        conn = sqlite3.connect(db_file, check_same_thread=False, factory=connection_factory)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        connections[db_file] = conn
+        with _lock:
+            _connections.append(conn)
+    return conn
 
+
+def close_connections():
+    """ close all the connections opened by get_connection """
+    global _generation
+    with _lock:
+        for conn in _connections:
+            conn.close()
+        _connections.clear()
+        _generation += 1
+
+
+atexit.register(close_connections)
+
+
+@contextmanager
+def create_connection(db_file, replica=False):
+    """ give the connection to a SQLite database: commit on success, rollback on error
+    The connection is not closed - the next with block of this thread reuses it.
+    In WAL mode readers do not wait for the writer, so every thread has its own connection.
+    With replica=True it is the connection of this thread to the in-memory copy of db_file (replica.py),
+    for the select_* helpers only: it is read-only (query_only), the writes go through get_replica(db_file).write.
+    """
+    if replica:
+        from replica import get_replica  # replica.py imports this module
+        yield get_replica(db_file).reader()
+        return
+    conn = get_connection(db_file)
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
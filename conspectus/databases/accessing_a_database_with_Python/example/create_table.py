@@ -15,34 +15,43 @@ def create_table(conn, create_table_sql):
     except Error as e:
         print(e)
 
-if __name__ == '__main__':
-    sql_create_projects_table = """
-    CREATE TABLE IF NOT EXISTS projects (
-     id integer PRIMARY KEY,
-     name text NOT NULL,
-     begin_date text,
-     end_date text
-    );
-    """
+sql_create_projects_table = """
+CREATE TABLE IF NOT EXISTS projects (
+ id integer PRIMARY KEY,
+ name text NOT NULL,
+ begin_date text,
+ end_date text
+);
+"""
 
-    sql_create_tasks_table = """
-    CREATE TABLE IF NOT EXISTS tasks (
-     id integer PRIMARY KEY,
-     name text NOT NULL,
-     priority integer,
-     project_id integer NOT NULL,
-     status Boolean default False,
-     begin_date text NOT NULL,
-     end_date text NOT NULL,
-     FOREIGN KEY (project_id) REFERENCES projects (id)
-    );
-    """
+sql_create_tasks_table = """
+CREATE TABLE IF NOT EXISTS tasks (
+ id integer PRIMARY KEY,
+ name text NOT NULL,
+ priority integer,
+ project_id integer NOT NULL,
+ status Boolean default False,
+ begin_date text NOT NULL,
+ end_date text NOT NULL,
+ FOREIGN KEY (project_id) REFERENCES projects (id)
+);
+"""
+
+# Indexes for the paginated selects (the partial ones contain only the tasks with one status) and for upsert.
+# They are migration 2 of migrations.py, an online migration adds __vN to their names
+sql_create_tasks_indexes = [
+    "CREATE INDEX IF NOT EXISTS idx_tasks_done ON tasks (id) WHERE status = 1;",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_open ON tasks (id) WHERE status = 0;",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_project ON tasks (project_id, id);",
+    # upsert_tasks in update.py finds the existing task by its project and name
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_project_name ON tasks (project_id, name);",
+]
+
+if __name__ == '__main__':
+    # the tables and the indexes are created by the migrations: after an online index build
+    # the indexes have other names (idx_tasks_open__v3), and CREATE INDEX IF NOT EXISTS idx_tasks_open
+    # would build a second copy of them
+    from migrations import MIGRATIONS, migrate
 
     with create_connection(database) as conn:
-        if conn is not None:
-						# create projects table
-            create_table(conn, sql_create_projects_table)
-						# create tasks table
-            create_table(conn, sql_create_tasks_table)
-        else:
-            print("Error! cannot create the database connection.")
+        print(migrate(conn, MIGRATIONS))
@@ -1,7 +1,11 @@
 from sqlite3 import Error
 
+from cache import query_cache
 from connect import create_connection, database
 
+# SQLite limits the number of ? in one statement (999 in old versions)
+CHUNK_SIZE = 500
+
 
 def delete_task(conn, id):
     """
@@ -15,12 +19,98 @@ def delete_task(conn, id):
     try:
         cur.execute(sql, (id,))
         conn.commit()
+        query_cache.invalidate("tasks")
+    except Error as e:
+        print(e)
+    finally:
+        cur.close()
+
+
+def delete_tasks(conn, ids, chunk_size=CHUNK_SIZE, vacuum=False):
+    """
+    Delete many tasks by id in one transaction
+    :param conn:  Connection to the SQLite database
+    :param ids: iterable of task ids
+    :param chunk_size: ids in one DELETE ... IN (...)
+    :param vacuum: give the freed pages back to the file system afterwards
+    :return: number of deleted tasks
+    """
+    ids = list(ids)
+    deleted = 0
+    cur = conn.cursor()
+    try:
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            placeholders = ", ".join("?" * len(chunk))
+            cur.execute(f"DELETE FROM tasks WHERE id IN ({placeholders})", chunk)
+            deleted += cur.rowcount
+        conn.commit()
+        query_cache.invalidate("tasks")
     except Error as e:
+        conn.rollback()
         print(e)
+        return 0
     finally:
         cur.close()
 
+    if vacuum:
+        reclaim_space(conn)
+    return deleted
+
+
+def purge_project(conn, project_id, vacuum=False):
+    """
+    Delete a project together with all its tasks in one transaction
+    :param conn:  Connection to the SQLite database
+    :param project_id: id of the project
+    :param vacuum: give the freed pages back to the file system afterwards
+    :return: number of deleted tasks
+    """
+    deleted = 0
+    cur = conn.cursor()
+    try:
+        # one set-based DELETE, the index on tasks(project_id, id) finds the rows
+        cur.execute("DELETE FROM tasks WHERE project_id=?", (project_id,))
+        deleted = cur.rowcount
+        cur.execute("DELETE FROM projects WHERE id=?", (project_id,))
+        conn.commit()
+        query_cache.invalidate("tasks", "projects")
+    except Error as e:
+        conn.rollback()
+        print(e)
+        return 0
+    finally:
+        cur.close()
+
+    if vacuum:
+        reclaim_space(conn)
+    return deleted
+
+
+def reclaim_space(conn, pages=None):
+    """
+    After DELETE the file keeps its size, the pages are only marked as free.
+    With auto_vacuum=INCREMENTAL they can be cut from the end of the file in small steps.
+    :param conn:  Connection to the SQLite database
+    :param pages: how many free pages to give back, None - all
+    :return: number of free pages left
+    """
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0:
+            # the mode of an existing database changes only with a full VACUUM - this happens once
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+        else:
+            # execute() makes only one step of this pragma (one page), executescript runs it to the end
+            pages = "" if pages is None else f"({int(pages)})"
+            conn.executescript(f"PRAGMA incremental_vacuum{pages};")
+        return conn.execute("PRAGMA freelist_count").fetchone()[0]
+    except Error as e:
+        print(e)
+
 
 if __name__ == "__main__":
     with create_connection(database) as conn:
         delete_task(conn, 1)
+        print(delete_tasks(conn, [2, 3, 4]))
+        print(purge_project(conn, 1, vacuum=True))
@@ -0,0 +1,170 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+
+import connect
+
+SLOW_QUERY_MS = 100
+BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)  # the last bucket is "more than 5000 ms"
+
+slow_log = logging.getLogger('sqlite.slow')
+
+
+def normalize(sql):
+    # one statistic for the statement whatever spaces and line breaks are inside
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+class Metrics:
+    """ counters of the statements: number of calls, errors, rows, latency histogram """
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._statements = {}
+
+    def _stat(self, sql):
+        stat = self._statements.get(sql)
+        if stat is None:
+            stat = self._statements[sql] = {
+                'calls': 0,
+                'errors': 0,
+                'rows': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'histogram': [0] * (len(BUCKETS_MS) + 1),
+            }
+        return stat
+
+    def record(self, sql, elapsed_ms, error=False):
+        with self._lock:
+            stat = self._stat(sql)
+            stat['calls'] += 1
+            stat['errors'] += error
+            stat['total_ms'] += elapsed_ms
+            stat['max_ms'] = max(stat['max_ms'], elapsed_ms)
+            stat['histogram'][bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+
+    def record_fetch(self, sql, rows, elapsed_ms):
+        # the time of fetch* is a part of the statement latency, but not a new call
+        with self._lock:
+            stat = self._stat(sql)
+            stat['rows'] += rows
+            stat['total_ms'] += elapsed_ms
+
+    def snapshot(self):
+        """ copy of the counters for a metrics exporter """
+        with self._lock:
+            return {
+                'buckets_ms': list(BUCKETS_MS),
+                'statements': {
+                    sql: {**stat, 'histogram': list(stat['histogram'])} for sql, stat in self._statements.items()
+                },
+            }
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+
+
+metrics = Metrics()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """ cursor that records every execute/executemany/fetch* into metrics
+    (the rows read by iterating over the cursor with for are not counted)
+    """
+
+    _sql = None
+
+    def _timed(self, sql, method, parameters, explain=True):
+        self._sql = normalize(sql)
+        start = time.perf_counter()
+        try:
+            result = method(sql, parameters)
+        except sqlite3.Error:
+            metrics.record(self._sql, (time.perf_counter() - start) * 1000, error=True)
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics.record(self._sql, elapsed_ms)
+        if elapsed_ms >= metrics.slow_query_ms:
+            self._log_slow(sql, parameters if explain else None, elapsed_ms)
+        return result
+
+    def _log_slow(self, sql, parameters, elapsed_ms):
+        plan = []
+        if parameters is not None:
+            try:
+                # a plain cursor, so EXPLAIN itself is not recorded
+                explain = sqlite3.Cursor(self.connection)
+                plan = [row[3] for row in explain.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)]
+                explain.close()
+            except sqlite3.Error:
+                pass
+        slow_log.warning("slow query %.1f ms: %s | plan: %s", elapsed_ms, normalize(sql), "; ".join(plan))
+
+    def execute(self, sql, parameters=()):
+        return self._timed(sql, super().execute, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # the parameters may be a generator that is already used up, so there is no EXPLAIN for executemany
+        return self._timed(sql, super().executemany, seq_of_parameters, explain=False)
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        rows = method(*args)
+        if self._sql is not None:
+            metrics.record_fetch(self._sql, len(rows), (time.perf_counter() - start) * 1000)
+        return rows
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        if self._sql is not None:
+            metrics.record_fetch(self._sql, row is not None, (time.perf_counter() - start) * 1000)
+        return row
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """ connection whose cursors (and conn.execute shortcuts) are instrumented """
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def enable():
+    """ the connections opened by connect.get_connection from now on are instrumented """
+    connect.connection_factory = InstrumentedConnection
+
+
+def disable():
+    connect.connection_factory = sqlite3.Connection
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    enable()
+    metrics.slow_query_ms = 0  # log everything for the example
+
+    with connect.create_connection(connect.database) as conn:
+        conn.execute("SELECT * FROM tasks WHERE status=?", (True,)).fetchall()
+        conn.execute("SELECT * FROM projects;").fetchall()
+    print(metrics.snapshot())
+
+# WARNING:sqlite.slow:slow query 0.1 ms: SELECT * FROM tasks WHERE status=? | plan: SCAN tasks
+# ...
@@ -0,0 +1,207 @@
+import re
+import time
+from datetime import datetime
+from sqlite3 import Error
+
+from connect import create_connection, database
+from create_table import sql_create_projects_table, sql_create_tasks_table, sql_create_tasks_indexes
+
+BATCH_SIZE = 5000
+PAUSE = 0.01  # seconds between batches, the writers of other connections get the lock meanwhile
+
+sql_create_migrations_table = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+ version integer PRIMARY KEY,
+ name text NOT NULL,
+ applied_at text NOT NULL
+);
+"""
+
+
+def applied_versions(conn):
+    """ versions of the migrations already applied to the database
+    :param conn: Connection object
+    :return: set of versions
+    """
+    conn.execute(sql_create_migrations_table)
+    return {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+
+def migrate(conn, migrations):
+    """ apply the migrations that are not applied yet, in the order of their versions
+    A step of a migration is a SQL string or a function that takes the connection.
+    :param conn: Connection object
+    :param migrations: list of (version, name, steps)
+    :return: list of applied versions
+    """
+    done = applied_versions(conn)
+    applied = []
+    for version, name, steps in sorted(migrations, key=lambda migration: migration[0]):
+        if version in done:
+            continue
+        try:
+            for step in steps:
+                if callable(step):
+                    # an online step manages its transactions itself
+                    if conn.in_transaction:
+                        conn.commit()
+                    step(conn)
+                else:
+                    # the DDL of the migration and its version are written in one transaction
+                    if not conn.in_transaction:
+                        conn.execute("BEGIN")
+                    conn.execute(step)
+            conn.execute(
+                "INSERT INTO schema_migrations(version, name, applied_at) VALUES(?,?,?)",
+                (version, name, datetime.now().isoformat(timespec='seconds')),
+            )
+            conn.commit()
+        except Error as e:
+            conn.rollback()
+            print(f"migration {version} ({name}) failed: {e}")
+            break
+        applied.append(version)
+    return applied
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+_INDEX_RE = re.compile(
+    r'\s*CREATE\s+(UNIQUE\s+)?INDEX\s+(IF\s+NOT\s+EXISTS\s+)?"?(\w+)"?\s+ON\s+"?\w+"?\s*(\(.*)',
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def _index_name(name, version):
+    # SQLite cannot rename an index, so the indexes of the new table get the version in their names
+    return f"{re.sub(r'__v[0-9]+$', '', name)}__v{version}"
+
+
+def _drop_shadow(conn, shadow):
+    for action in ('insert', 'update', 'delete'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {shadow}_{action}")
+    conn.execute(f"DROP TABLE IF EXISTS {shadow}")
+
+
+def add_index_online(table, create_index_sql, version, key='id', batch_size=BATCH_SIZE, pause=PAUSE):
+    """ build a new index without holding the write lock for the whole build
+    CREATE INDEX on a big table locks the database until the index is ready. Instead:
+    1. a shadow table is created with the same columns, the existing indexes and the new one (it is empty, so fast);
+    2. triggers copy every INSERT, UPDATE and DELETE of the table into the shadow table;
+    3. the rows are copied by batch_size in separate short transactions;
+    4. in one short transaction the tables are swapped by RENAME, and the old table is dropped.
+    SQLite cannot rename an index, and building it again after the swap would lock the table as long as
+    CREATE INDEX does. So the indexes built on the shadow table stay, with the version of the migration
+    in their names: idx_tasks_open becomes idx_tasks_open__v3. That is why create_table.py creates
+    the indexes with migrate, not by their names.
+    A row that breaks a new UNIQUE index stops the migration, the shadow table and the triggers are removed
+    and the table is not changed.
+    :param table: table name
+    :param create_index_sql: CREATE INDEX ... ON table (...) statement
+    :param version: version of the migration, it is added to the names of the indexes
+    :param key: INTEGER PRIMARY KEY column of the table
+    :return: function for migrate
+    """
+    def step(conn):
+        shadow = f"{table}__shadow"
+        columns = _columns(conn, table)
+        column_list = ", ".join(columns)
+        new_values = ", ".join(f"NEW.{column}" for column in columns)
+
+        table_sql = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()[0]
+        index_sqls = [
+            row[0] for row in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+            )
+        ]
+        index_sqls.append(create_index_sql)
+        # (unique, name, columns) of every index of the new table
+        indexes = []
+        for index_sql in index_sqls:
+            match = _INDEX_RE.match(index_sql)
+            indexes.append((match.group(1) or '', match.group(3), match.group(4).strip().rstrip(';')))
+
+        try:
+            # 1. shadow table and its indexes, the leftovers of a failed attempt are removed first
+            conn.execute("BEGIN IMMEDIATE")
+            _drop_shadow(conn, shadow)
+            conn.execute(re.sub(r'^CREATE TABLE\s+("?)\w+\1', f'CREATE TABLE {shadow}', table_sql.strip(), count=1))
+            for unique, name, rest in indexes:
+                conn.execute(f"CREATE {unique}INDEX {_index_name(name, version)} ON {shadow} {rest}")
+
+            # 2. triggers keep the shadow table up to date while the rows are being copied.
+            # Plain INSERT: a row that breaks a unique index fails instead of replacing another row
+            conn.execute(f"""
+            CREATE TRIGGER {shadow}_insert AFTER INSERT ON {table} BEGIN
+                DELETE FROM {shadow} WHERE {key} = NEW.{key};
+                INSERT INTO {shadow}({column_list}) VALUES({new_values});
+            END""")
+            conn.execute(f"""
+            CREATE TRIGGER {shadow}_update AFTER UPDATE ON {table} BEGIN
+                DELETE FROM {shadow} WHERE {key} = OLD.{key};
+                DELETE FROM {shadow} WHERE {key} = NEW.{key};
+                INSERT INTO {shadow}({column_list}) VALUES({new_values});
+            END""")
+            conn.execute(f"""
+            CREATE TRIGGER {shadow}_delete AFTER DELETE ON {table} BEGIN
+                DELETE FROM {shadow} WHERE {key} = OLD.{key};
+            END""")
+            conn.commit()
+
+            # 3. batched backfill, the rows already copied by the triggers are skipped
+            last_key = None
+            while True:
+                conn.execute("BEGIN IMMEDIATE")
+                upto = conn.execute(
+                    f"SELECT MAX({key}) FROM (SELECT {key} FROM {table} WHERE {key} > IFNULL(?, -9223372036854775808)"
+                    f" ORDER BY {key} LIMIT ?)",
+                    (last_key, batch_size),
+                ).fetchone()[0]
+                if upto is None:
+                    conn.commit()
+                    break
+                conn.execute(
+                    f"INSERT INTO {shadow}({column_list}) SELECT {column_list} FROM {table} AS t"
+                    f" WHERE {key} > IFNULL(?, -9223372036854775808) AND {key} <= ?"
+                    f" AND NOT EXISTS (SELECT 1 FROM {shadow} AS s WHERE s.{key} = t.{key})",
+                    (last_key, upto),
+                )
+                conn.commit()
+                last_key = upto
+                time.sleep(pause)
+
+            # 4. swap: a short transaction, the old table is dropped with its indexes and triggers.
+            # First DROP, then RENAME - so the references of other tables to this name stay correct
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"ALTER TABLE {shadow} RENAME TO {table}")
+            conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (shadow,)).fetchone():
+                _drop_shadow(conn, shadow)
+                conn.commit()
+            raise
+
+    return step
+
+
+MIGRATIONS = [
+    (1, 'create projects and tasks', [sql_create_projects_table, sql_create_tasks_table]),
+    (2, 'indexes for pagination and upsert', sql_create_tasks_indexes),
+    (3, 'index of tasks by end date', [
+        add_index_online('tasks', "CREATE INDEX idx_tasks_end_date ON tasks (end_date, status);", version=3),
+    ]),
+]
+
+
+if __name__ == '__main__':
+    with create_connection(database) as conn:
+        print(migrate(conn, MIGRATIONS))
+
+# [1, 2, 3]
@@ -0,0 +1,193 @@
+import itertools
+import re
+import sqlite3
+import threading
+import time
+from sqlite3 import Error
+
+from cache import query_cache
+from connect import database
+
+MAX_STALENESS = 1.0  # seconds
+
+_names = itertools.count()
+
+_STATEMENT = re.compile(r'\s*(INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"?(\w+)"?', re.IGNORECASE)
+
+
+class Replica:
+    """ in-memory copy of a database for read-heavy work
+    The file is copied into a shared in-memory database with the backup API, and the select helpers
+    read from it without touching the disk: select_projects(replica.reader()).
+    Writes made with replica.write go to the file with RETURNING, and the rows as they were written
+    to the file are copied into the copy by rowid, so the copy is updated incrementally, and random(),
+    datetime('now') and the like give the same values in both. A statement that can change other rows
+    than it returns (INSERT OR REPLACE, upsert, a table with triggers, an UPDATE of the INTEGER PRIMARY KEY)
+    or a table WITHOUT ROWID makes the copy load again. Writes of other processes are noticed by PRAGMA data_version:
+    it is checked not more often than max_staleness seconds, and if the file changed, the copy is loaded again.
+    """
+
+    def __init__(self, db_file=database, max_staleness=MAX_STALENESS):
+        self.db_file = db_file
+        self.max_staleness = max_staleness
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._disk = sqlite3.connect(db_file, check_same_thread=False)
+        self._anchor = None
+        self._uri = None
+        self._generation = 0
+        self._load()
+
+    def _load(self):
+        # a new in-memory database every time: the readers of the old one finish their queries undisturbed
+        uri = f"file:replica_{next(_names)}?mode=memory&cache=shared"
+        # the anchor connection keeps the in-memory database alive and applies the writes
+        anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._disk.backup(anchor)
+        old, self._anchor, self._uri = self._anchor, anchor, uri
+        self._generation += 1
+        self._data_version = self._disk.execute("PRAGMA data_version").fetchone()[0]
+        self._checked = time.monotonic()
+        if old is not None:
+            old.close()
+        query_cache.clear()
+
+    def refresh(self, force=False):
+        """ load the copy again if the file was changed by someone else """
+        with self._lock:
+            data_version = self._disk.execute("PRAGMA data_version").fetchone()[0]
+            if force or data_version != self._data_version:
+                self._load()
+            self._checked = time.monotonic()
+
+    def reader(self):
+        """ connection of this thread to the in-memory copy """
+        if time.monotonic() - self._checked > self.max_staleness:
+            self.refresh()
+
+        with self._lock:
+            uri, generation = self._uri, self._generation
+
+        conn = getattr(self._local, 'conn', None)
+        if getattr(self._local, 'generation', None) != generation:
+            if conn is not None:
+                conn.close()
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            # in a shared cache readers would wait for the table locks of the writer without it
+            conn.execute("PRAGMA read_uncommitted=1")
+            # a write here would change only the copy and be lost at the next load - it must go through write()
+            conn.execute("PRAGMA query_only=ON")
+            self._local.conn, self._local.generation = conn, generation
+        return conn
+
+    def _incremental(self, sql):
+        """ (verb, table, columns) if the rows returned by the statement are all that it changes, else None """
+        match = _STATEMENT.match(sql)
+        upper = sql.upper()
+        if match is None or re.search(r'\b(REPLACE|CONFLICT|RETURNING)\b', upper):
+            return None
+        verb, table = match.group(1).split()[0].upper(), match.group(2)
+        table_sql = self._disk.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        triggers = self._disk.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,)
+        ).fetchone()
+        if table_sql is None or 'WITHOUT ROWID' in table_sql[0].upper() or triggers:
+            return None
+        info = self._disk.execute(f"PRAGMA table_info({table})").fetchall()
+        columns = [row[1] for row in info]
+        # UPDATE of the INTEGER PRIMARY KEY changes the rowid: the row with the old rowid stays in the copy
+        keys = [row[1] for row in info if row[5]]
+        if verb == 'UPDATE' and len(keys) == 1:
+            set_part = re.split(r'\bWHERE\b', upper)[0]
+            if re.search(rf'\b{keys[0].upper()}\b', set_part):
+                return None
+        return verb, table, columns
+
+    def write(self, sql, parameters=(), tables=()):
+        """ execute INSERT, UPDATE or DELETE on the file and then copy the changed rows into the copy
+        :return: lastrowid for INSERT, rowcount for the others
+        """
+        with self._lock:
+            plan = self._incremental(sql)
+            cur = self._disk.cursor()
+            try:
+                if plan is None:
+                    cur.execute(sql, parameters)
+                    rows = None
+                else:
+                    _, table, columns = plan
+                    cur.execute(f"{sql.strip().rstrip(';')} RETURNING rowid, {', '.join(columns)}", parameters)
+                    rows = cur.fetchall()
+                self._disk.commit()
+            except Error:
+                self._disk.rollback()
+                raise
+            if sql.lstrip().upper().startswith('INSERT'):
+                result = cur.lastrowid
+            else:
+                result = cur.rowcount if rows is None else len(rows)
+
+            if plan is None:
+                self._load()
+            else:
+                verb, table, columns = plan
+                try:
+                    if verb == 'DELETE':
+                        self._anchor.executemany(f"DELETE FROM {table} WHERE rowid = ?", [row[:1] for row in rows])
+                    else:
+                        self._anchor.executemany(
+                            f"INSERT OR REPLACE INTO {table}(rowid, {', '.join(columns)})"
+                            f" VALUES({', '.join('?' * (len(columns) + 1))})",
+                            rows,
+                        )
+                    self._anchor.commit()
+                except Error:
+                    # the copy is not the same as the file any more - take it again
+                    self._load()
+        if tables:
+            query_cache.invalidate(*tables)
+        return result
+
+    def close(self):
+        with self._lock:
+            self._anchor.close()
+            self._disk.close()
+
+
+_replicas = {}
+_replicas_lock = threading.Lock()
+
+
+def get_replica(db_file=database, max_staleness=MAX_STALENESS):
+    """ the process-wide replica of db_file """
+    with _replicas_lock:
+        if db_file not in _replicas:
+            _replicas[db_file] = Replica(db_file, max_staleness)
+        return _replicas[db_file]
+
+
+if __name__ == '__main__':
+    from connect import create_connection
+    from select import select_projects
+
+    # the select helpers read the copy
+    with create_connection(database, replica=True) as conn:
+        print(select_projects(conn))
+
+    replica = get_replica()
+    conn = replica.reader()
+    print(conn.execute("SELECT COUNT(*) FROM tasks").fetchone())
+
+    sql = '''
+    INSERT INTO tasks(name,priority,status,project_id,begin_date,end_date) VALUES(?,?,?,?,?,?);
+    '''
+    print(replica.write(sql, ('Write the docs', 2, False, 1, '2022-01-06', '2022-01-08'), tables=('tasks',)))
+    print(conn.execute("SELECT COUNT(*) FROM tasks").fetchone())
+    replica.close()
+
+# [(1, 'Cool App with SQLite & Python', '2022-01-01', '2022-01-30')]
+# (2,)
+# 3
+# (3,)
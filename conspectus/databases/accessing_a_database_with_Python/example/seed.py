@@ -1,7 +1,11 @@
+from itertools import islice
 from sqlite3 import Error
 
+from cache import query_cache
 from connect import create_connection, database
 
+CHUNK_SIZE = 10_000
+
 def create_project(conn, project):
     """
     Create a new project into the projects table
@@ -16,6 +20,7 @@ def create_project(conn, project):
     try:
         cur.execute(sql, project)
         conn.commit()
+        query_cache.invalidate("projects")
     except Error as e:
         print(e)
     finally:
@@ -38,6 +43,7 @@ def create_task(conn, task):
     try:
         cur.execute(sql, task)
         conn.commit()
+        query_cache.invalidate("tasks")
     except Error as e:
         print(e)
     finally:
@@ -45,6 +51,64 @@ def create_task(conn, task):
 
     return cur.lastrowid
 
+def _insert_bulk(conn, table, sql, rows, chunk_size):
+    """
+    Insert rows with executemany, one transaction and one commit per chunk_size rows
+    :param conn:
+    :param table: table name, needed to know the ids
+    :param sql: INSERT statement
+    :param rows: any iterable of tuples (a generator too)
+    :param chunk_size: rows per commit, None - everything in one transaction
+    :return: list of ranges of inserted ids
+    """
+    id_ranges = []
+    rows = iter(rows)
+    cur = conn.cursor()
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            # BEGIN IMMEDIATE takes the write lock at once, so nobody inserts between our MAX(id) and INSERT
+            if not conn.in_transaction:
+                cur.execute("BEGIN IMMEDIATE")
+            first_id = cur.execute(f"SELECT IFNULL(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+            cur.executemany(sql, chunk)
+            conn.commit()
+            query_cache.invalidate(table)
+            # id is INTEGER PRIMARY KEY, so new rows get MAX(id) + 1, MAX(id) + 2, ...
+            id_ranges.append(range(first_id, first_id + len(chunk)))
+    except Error as e:
+        conn.rollback()
+        print(e)
+    finally:
+        cur.close()
+
+    return id_ranges
+
+def create_projects_bulk(conn, projects, chunk_size=CHUNK_SIZE):
+    """
+    Create many projects with executemany instead of one commit per project
+    :param conn:
+    :param projects: iterable of (name, begin_date, end_date)
+    :param chunk_size:
+    :return: list of ranges of project ids
+    """
+    sql = '''
+    INSERT INTO projects(name,begin_date,end_date) VALUES(?,?,?);
+    '''
+    return _insert_bulk(conn, "projects", sql, projects, chunk_size)
+
+def create_tasks_bulk(conn, tasks, chunk_size=CHUNK_SIZE):
+    """
+    Create many tasks with executemany instead of one commit per task
+    :param conn:
+    :param tasks: iterable of (name, priority, status, project_id, begin_date, end_date)
+    :param chunk_size:
+    :return: list of ranges of task ids
+    """
+    sql = '''
+    INSERT INTO tasks(name,priority,status,project_id,begin_date,end_date) VALUES(?,?,?,?,?,?);
+    '''
+    return _insert_bulk(conn, "tasks", sql, tasks, chunk_size)
+
 if __name__ == '__main__':
     with create_connection(database) as conn:
 # create a new project
@@ -60,3 +124,8 @@ if __name__ == '__main__':
         print(create_task(conn, task_1))
         print(create_task(conn, task_2))
 
+# create many tasks at once
+        tasks = ((f'Task {i}', 2, False, project_id, '2022-01-06', '2022-01-30') for i in range(1, 1001))
+        print(create_tasks_bulk(conn, tasks))
+# [range(3, 1003)]
+
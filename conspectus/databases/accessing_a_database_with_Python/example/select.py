@@ -1,7 +1,10 @@
 from sqlite3 import Error
 
+from cache import query_cache
 from connect import create_connection, database
 
+PAGE_SIZE = 100
+
 
 def select_projects(conn):
     """
@@ -12,8 +15,7 @@ def select_projects(conn):
     rows = None
     cur = conn.cursor()
     try:
-        cur.execute("SELECT * FROM projects;")
-        rows = cur.fetchall()
+        rows = query_cache.fetchall(cur, "SELECT * FROM projects;", tables=("projects",))
     except Error as e:
         print(e)
     finally:
@@ -30,8 +32,7 @@ def select_all_tasks(conn):
     rows = None
     cur = conn.cursor()
     try:
-        cur.execute("SELECT * FROM tasks")
-        rows = cur.fetchall()
+        rows = query_cache.fetchall(cur, "SELECT * FROM tasks", tables=("tasks",))
     except Error as e:
         print(e)
     finally:
@@ -49,8 +50,7 @@ def select_task_by_status(conn, status):
     rows = None
     cur = conn.cursor()
     try:
-        cur.execute("SELECT * FROM tasks WHERE status=?", (status,))
-        rows = cur.fetchall()
+        rows = query_cache.fetchall(cur, "SELECT * FROM tasks WHERE status=?", (status,), tables=("tasks",))
     except Error as e:
         print(e)
     finally:
@@ -58,6 +58,69 @@ def select_task_by_status(conn, status):
     return rows
 
 
+def _select_page(conn, sql, parameters, limit):
+    """
+    Keyset pagination: the next page starts after the last id of the previous one,
+    so SQLite jumps into the index instead of skipping OFFSET rows
+    :return: (rows, token of the next page or None if this page is the last)
+    """
+    rows, next_token = None, None
+    cur = conn.cursor()
+    try:
+        # one row more than needed tells whether there is a next page
+        cur.execute(sql, (*parameters, limit + 1))
+        rows = cur.fetchall()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_token = rows[-1][0]
+    except Error as e:
+        print(e)
+    finally:
+        cur.close()
+    return rows, next_token
+
+
+def select_tasks_page(conn, after_id=0, limit=PAGE_SIZE):
+    """
+    Query one page of the tasks table
+    :param conn: the Connection object
+    :param after_id: token returned with the previous page, 0 for the first page
+    :param limit: rows per page
+    :return: (rows tasks, next token)
+    """
+    sql = "SELECT * FROM tasks WHERE id > ? ORDER BY id LIMIT ?"
+    return _select_page(conn, sql, (after_id or 0,), limit)
+
+
+def select_task_by_status_page(conn, status, after_id=0, limit=PAGE_SIZE):
+    """
+    Query one page of tasks by status
+    :param conn: the Connection object
+    :param status:
+    :param after_id: token returned with the previous page, 0 for the first page
+    :param limit: rows per page
+    :return: (rows tasks, next token)
+    """
+    # status is written into the query as 0 or 1 (not as ?), otherwise SQLite cannot use
+    # the partial indexes idx_tasks_done / idx_tasks_open from create_table.py (idx_tasks_done__vN / ... after
+    # an online migration)
+    sql = f"SELECT * FROM tasks WHERE status = {int(bool(status))} AND id > ? ORDER BY id LIMIT ?"
+    return _select_page(conn, sql, (after_id or 0,), limit)
+
+
+def select_tasks_by_project_page(conn, project_id, after_id=0, limit=PAGE_SIZE):
+    """
+    Query one page of tasks of a project
+    :param conn: the Connection object
+    :param project_id:
+    :param after_id: token returned with the previous page, 0 for the first page
+    :param limit: rows per page
+    :return: (rows tasks, next token)
+    """
+    sql = "SELECT * FROM tasks WHERE project_id = ? AND id > ? ORDER BY id LIMIT ?"
+    return _select_page(conn, sql, (project_id, after_id or 0), limit)
+
+
 if __name__ == "__main__":
     with create_connection(database) as conn:
         print("Projects:")
@@ -69,3 +132,9 @@ if __name__ == "__main__":
         print("\\nQuery task by status:")
         task_by_priority = select_task_by_status(conn, True)
         print(task_by_priority)
+        print("\\nQuery tasks page by page:")
+        token = 0
+        while token is not None:
+            page, token = select_tasks_page(conn, token, limit=2)
+            print(page)
+        print("\\nCache:", query_cache.stats())
@@ -1,5 +1,6 @@
 from sqlite3 import Error
 
+from cache import query_cache
 from connect import create_connection, database
 
 def update_task(conn, parameters):
@@ -18,6 +19,7 @@ def update_task(conn, parameters):
     try:
         cur.execute(sql, parameters)
         conn.commit()
+        query_cache.invalidate("tasks")
     except Error as e:
         print(e)
     finally:
@@ -40,12 +42,129 @@ def update_task_status(conn, parameters):
     try:
         cur.execute(sql, parameters)
         conn.commit()
+        query_cache.invalidate("tasks")
     except Error as e:
         print(e)
     finally:
         cur.close()
 
+def update_tasks_bulk(conn, updates, method='executemany'):
+    """
+    update priority, begin_date, and end date of many tasks in one transaction
+    :param conn:
+    :param updates: list of (id, priority, begin_date, end_date)
+    :param method: 'executemany' - one UPDATE per row,
+                   'temp_table' - rows go to a temporary table and one UPDATE joins it with tasks
+    :return: number of updated tasks
+    """
+    if method == 'temp_table':
+        return _update_from_temp_table(conn, updates)
+
+    # ?1 is the first element of the tuple - the id, so the tuples need no reordering
+    sql = '''
+    UPDATE tasks
+    SET priority = ?2, begin_date = ?3, end_date = ?4
+    WHERE id = ?1
+    '''
+    cur = conn.cursor()
+    try:
+        cur.executemany(sql, updates)
+        conn.commit()
+        query_cache.invalidate("tasks")
+        return cur.rowcount
+    except Error as e:
+        conn.rollback()
+        print(e)
+    finally:
+        cur.close()
+
+def _update_from_temp_table(conn, updates):
+    cur = conn.cursor()
+    try:
+        cur.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS task_updates (
+         id integer PRIMARY KEY,
+         priority integer,
+         begin_date text,
+         end_date text
+        );
+        ''')
+        cur.execute("DELETE FROM task_updates")
+        cur.executemany("INSERT OR REPLACE INTO task_updates VALUES (?, ?, ?, ?)", updates)
+        cur.execute('''
+        UPDATE tasks
+        SET priority = (SELECT u.priority FROM task_updates u WHERE u.id = tasks.id),
+            begin_date = (SELECT u.begin_date FROM task_updates u WHERE u.id = tasks.id),
+            end_date = (SELECT u.end_date FROM task_updates u WHERE u.id = tasks.id)
+        WHERE id IN (SELECT id FROM task_updates)
+        ''')
+        updated = cur.rowcount
+        cur.execute("DELETE FROM task_updates")
+        conn.commit()
+        query_cache.invalidate("tasks")
+        return updated
+    except Error as e:
+        conn.rollback()
+        print(e)
+    finally:
+        cur.close()
+
+def update_task_status_bulk(conn, updates):
+    """
+    update status of many tasks in one transaction
+    :param conn:
+    :param updates: list of (id, status)
+    :return: number of updated tasks
+    """
+    sql = '''
+    UPDATE tasks
+    SET status = ?2
+    WHERE id = ?1
+    '''
+    cur = conn.cursor()
+    try:
+        cur.executemany(sql, updates)
+        conn.commit()
+        query_cache.invalidate("tasks")
+        return cur.rowcount
+    except Error as e:
+        conn.rollback()
+        print(e)
+    finally:
+        cur.close()
+
+def upsert_tasks(conn, tasks):
+    """
+    insert tasks or update the existing ones with the same (project_id, name)
+    needs the unique index idx_tasks_project_name from create_table.py (or its idx_tasks_project_name__vN)
+    :param conn:
+    :param tasks: list of (name, priority, status, project_id, begin_date, end_date)
+    :return: number of inserted or updated tasks
+    """
+    sql = '''
+    INSERT INTO tasks(name,priority,status,project_id,begin_date,end_date) VALUES(?,?,?,?,?,?)
+    ON CONFLICT(project_id, name) DO UPDATE SET
+        priority = excluded.priority,
+        status = excluded.status,
+        begin_date = excluded.begin_date,
+        end_date = excluded.end_date
+    '''
+    cur = conn.cursor()
+    try:
+        cur.executemany(sql, tasks)
+        conn.commit()
+        query_cache.invalidate("tasks")
+        return cur.rowcount
+    except Error as e:
+        conn.rollback()
+        print(e)
+    finally:
+        cur.close()
+
 if __name__ == '__main__':
     with create_connection(database) as conn:
         update_task(conn, (2, '2022-01-04', '2022-01-06', 1))
         update_task_status(conn, (True, 2))
+        update_tasks_bulk(conn, [(1, 3, '2022-01-01', '2022-01-03'), (2, 3, '2022-01-04', '2022-01-07')])
+        update_task_status_bulk(conn, [(1, True), (2, True)])
+        upsert_tasks(conn, [('Analyze the requirements of the app', 1, True, 1, '2022-01-01', '2022-01-02')])
@@ -0,0 +1,175 @@
+import queue
+import threading
+from concurrent.futures import Future
+from sqlite3 import Error
+
+from cache import query_cache
+from connect import database, get_connection
+
+MAX_BATCH = 1000
+MAX_DELAY = 0.005  # seconds the writer waits for more operations before the commit
+
+_STOP = object()
+
+
+class WriterQueue:
+    """ one writer thread for a SQLite file
+    SQLite allows only one writer at a time, so many threads calling create_task get "database is locked".
+    Here the threads only put operations into a queue and get a Future. The writer thread takes
+    all the operations that are waiting and executes them in one transaction (group commit):
+    one commit and one fsync for the whole group instead of one per row.
+    """
+
+    def __init__(self, db_file=database, max_batch=MAX_BATCH, max_delay=MAX_DELAY):
+        self.db_file = db_file
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, sql, parameters=(), tables=()):
+        """ put an INSERT, UPDATE or DELETE into the queue
+        :param sql: statement
+        :param parameters:
+        :param tables: tables to invalidate in the query cache after the commit
+        :return: Future with lastrowid for INSERT, rowcount for the others
+        """
+        future = Future()
+        self._queue.put((sql, parameters, tables, future))
+        return future
+
+    def close(self):
+        """ execute the operations left in the queue and stop the writer """
+        with _writers_lock:
+            if _writers.get(self.db_file) is self:
+                del _writers[self.db_file]
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _next_group(self):
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        group = [item]
+        while len(group) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=self.max_delay)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return group, True
+            group.append(item)
+        return group, False
+
+    def _run(self):
+        # the connection is created in the writer thread and used only there
+        conn = get_connection(self.db_file)
+        stop = False
+        while not stop:
+            group, stop = self._next_group()
+            if not group:
+                continue
+            try:
+                self._write(conn, group)
+            except Exception as e:
+                # the writer must live on: an error only fails the operations of this group
+                if conn.in_transaction:
+                    conn.rollback()
+                for _, _, _, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _write(self, conn, group):
+        # the futures cancelled by the producers are skipped, the others can no longer be cancelled
+        group = [item for item in group if item[3].set_running_or_notify_cancel()]
+        if not group:
+            return
+        results = []
+        tables = set()
+        cur = conn.cursor()
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            for sql, parameters, op_tables, future in group:
+                # a savepoint for each operation: an error cancels this operation only, not the group
+                cur.execute("SAVEPOINT op")
+                try:
+                    cur.execute(sql, parameters)
+                except Error as e:
+                    cur.execute("ROLLBACK TO op")
+                    results.append((future, None, e))
+                else:
+                    is_insert = sql.lstrip().upper().startswith('INSERT')
+                    results.append((future, cur.lastrowid if is_insert else cur.rowcount, None))
+                    tables.update(op_tables)
+                cur.execute("RELEASE op")
+            conn.commit()
+        except Error as e:
+            conn.rollback()
+            for _, _, _, future in group:
+                future.set_exception(e)
+            return
+        finally:
+            cur.close()
+
+        if tables:
+            query_cache.invalidate(*tables)
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_file=database):
+    """ the process-wide writer of db_file """
+    with _writers_lock:
+        if db_file not in _writers:
+            _writers[db_file] = WriterQueue(db_file)
+        return _writers[db_file]
+
+
+def create_task(task, db_file=database):
+    """ queue a new task
+    :param task: (name, priority, status, project_id, begin_date, end_date)
+    :return: Future with the task id
+    """
+    sql = '''
+    INSERT INTO tasks(name,priority,status,project_id,begin_date,end_date) VALUES(?,?,?,?,?,?);
+    '''
+    return get_writer(db_file).submit(sql, task, tables=('tasks',))
+
+
+def update_task_status(parameters, db_file=database):
+    """ queue a status update
+    :param parameters: (status, id)
+    :return: Future with the number of updated tasks
+    """
+    return get_writer(db_file).submit("UPDATE tasks SET status = ? WHERE id = ?", parameters, tables=('tasks',))
+
+
+def delete_task(id, db_file=database):
+    """ queue a task delete
+    :param id: id of the task
+    :return: Future with the number of deleted tasks
+    """
+    return get_writer(db_file).submit("DELETE FROM tasks WHERE id=?", (id,), tables=('tasks',))
+
+
+if __name__ == '__main__':
+    from concurrent.futures import ThreadPoolExecutor
+
+    def producer(n):
+        task = (f'Task from thread {n}', 1, False, 1, '2022-01-01', '2022-01-02')
+        return create_task(task).result()
+
+    # 8 threads create 100 tasks, the writer commits them in a few groups
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        print(sorted(executor.map(producer, range(100)))[:5])
+    get_writer().close()
+
+# [3, 4, 5, 6, 7]
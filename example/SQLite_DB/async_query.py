@@ -0,0 +1,136 @@
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DATABASE = "salary.db"
+WORKERS = 4
+BATCH_SIZE = 500
+
+
+"""
+sqlite3 is synchronous: while a query is executed, the event loop of an asyncio service stands still.
+The executor moves the queries to a bounded pool of worker threads. Every worker opens its own connection
+once (a sqlite3 connection should be used by one thread), and the coroutine only waits for the result.
+
+    executor = AsyncQueryExecutor()
+    rows = await executor.execute(sql, params)
+    async for row in executor.iterate(sql, params):
+        ...
+"""
+
+
+class AsyncQueryExecutor:
+    def __init__(self, db_file=DATABASE, workers=WORKERS):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sqlite")
+
+    def _connection(self):
+        # One connection per worker thread, created on the first query of this thread
+        con = getattr(self._local, "con", None)
+        if con is None:
+            # check_same_thread=False only to be able to close the connections from close()
+            con = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._local.con = con
+            with self._lock:
+                self._connections.append(con)
+        return con
+
+    def _execute(self, sql, params):
+        cur = self._connection().cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    async def execute(self, sql: str, params=()) -> list:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._execute, sql, params)
+
+    def _produce(self, sql, params, batch_size, queue, loop, stop):
+        # Works in a worker thread: reads the cursor by batches and passes them to the event loop.
+        # queue is bounded, so the worker waits while the consumer is slow and memory does not grow
+        def put(item):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        cur = self._connection().cursor()
+        try:
+            cur.execute(sql, params)
+            while not stop.is_set():
+                batch = cur.fetchmany(batch_size)
+                if not batch:
+                    break
+                put(batch)
+            put(None)
+        except Exception as e:
+            put(e)
+        finally:
+            cur.close()
+
+    async def iterate(self, sql: str, params=(), batch_size=BATCH_SIZE, max_batches=2):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=max_batches)
+        stop = threading.Event()
+        job = loop.run_in_executor(
+            self._executor, self._produce, sql, params, batch_size, queue, loop, stop
+        )
+        try:
+            while True:
+                batch = await queue.get()
+                if batch is None:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                for row in batch:
+                    yield row
+        finally:
+            # If the consumer stopped early, let the worker finish and free its thread
+            stop.set()
+            while not job.done():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.01)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for con in self._connections:
+                con.close()
+            self._connections.clear()
+
+
+async def main():
+    executor = AsyncQueryExecutor()
+    try:
+        sql_posts = """
+        SELECT ROUND(AVG(p.total), 2) AS average_total, e.post
+        FROM payments AS p
+        LEFT JOIN employees AS e ON p.employee_id = e.id
+        GROUP BY e.post;
+        """
+        sql_companies = """
+        SELECT COUNT(*), c.company_name
+        FROM employees e
+        LEFT JOIN companies c ON e.company_id = c.id
+        GROUP BY c.id;
+        """
+        # Both reports are executed at the same time in different worker threads
+        posts, companies = await asyncio.gather(
+            executor.execute(sql_posts), executor.execute(sql_companies)
+        )
+        print(posts)
+        print(companies)
+
+        async for row in executor.iterate("SELECT employee_id, date_of, total FROM payments WHERE total > ?", (9900,)):
+            print(row)
+    finally:
+        executor.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import create_db
+import fill_data
+from index_advisor import QUERIES
+
+SIZES = [10**3, 10**4, 10**5, 10**6, 10**7]  # number of payment rows
+NUMBER_MONTHS = 12
+SEED = 42
+THRESHOLD = 0.2  # 20% slower is a regression
+MIN_DIFFERENCE = 0.001  # seconds, a smaller difference is noise whatever the percent
+REPEATS = 5
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+"""
+The benchmark generates the salary database of different sizes and measures every step:
+the schema creation (create_db), the bulk insert (insert_data_to_db and insert_data_streaming)
+and the queries of the select scripts. The data does not depend on Faker and the random seed is fixed,
+so two runs on the same machine measure the same work.
+Every step is executed REPEATS times and the best time is kept: the first (cold) run and the runs disturbed
+by other processes are slower, the best one is the closest to the cost of the work itself.
+
+    python benchmark.py run results.json [max_rows]
+    python benchmark.py compare old.json new.json
+"""
+
+
+@contextmanager
+def working_directory(path):
+    # create_db and insert_data_to_db work with salary.db in the current directory
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def timed(function, setup=None, repeats=REPEATS):
+    # The best of repeats runs, setup prepares every run and is not measured
+    best = None
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 6)
+
+
+def dataset(rows, number_months=NUMBER_MONTHS, seed=SEED):
+    # rows payments = number_employees * number_months
+    random.seed(seed)
+    number_employees = max(rows // number_months, 1)
+    posts = [f"Post {i}" for i in range(1, fill_data.NUMBER_POST + 1)]
+    companies = [(f"Company {i}",) for i in range(1, fill_data.NUMBER_COMPANIES + 1)]
+    employees = [
+        (f"Employee {i}", random.choice(posts), random.randint(1, fill_data.NUMBER_COMPANIES))
+        for i in range(1, number_employees + 1)
+    ]
+    return companies, employees, number_employees
+
+
+def run_size(rows, tmp, repeats=REPEATS):
+    result = {}
+    companies, employees, number_employees = dataset(rows)
+
+    # The original path: all payments in one list and one executemany, every run on a clean database
+    payments = list(fill_data.generate_payments(number_employees, NUMBER_MONTHS))
+    result["create_db"] = timed(create_db.create_db, repeats=repeats)
+    result["insert_data_to_db"] = timed(
+        lambda: fill_data.insert_data_to_db(companies, employees, payments), setup=create_db.create_db, repeats=repeats
+    )
+    del payments
+
+    with sqlite3.connect("salary.db") as con:
+        for name, sql in QUERIES.items():
+            result[name] = timed(lambda: con.execute(sql).fetchall(), repeats=repeats)
+    con.close()
+
+    # The streaming path on a clean database, the payments are generated again with the same seed
+    def clean_database():
+        create_db.create_db()
+        random.seed(SEED)
+
+    result["insert_data_streaming"] = timed(
+        lambda: fill_data.insert_data_streaming(
+            iter(companies),
+            iter(employees),
+            fill_data.generate_payments(number_employees, NUMBER_MONTHS),
+        ),
+        setup=clean_database,
+        repeats=repeats,
+    )
+    for name in os.listdir(tmp):
+        if name.startswith("salary.db"):
+            os.remove(os.path.join(tmp, name))
+    return result
+
+
+def run(sizes=SIZES, repeats=REPEATS):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(os.path.join(HERE, "salary.sql"), tmp)
+        with working_directory(tmp):
+            for rows in sizes:
+                results[str(rows)] = run_size(rows, tmp, repeats)
+                print(rows, results[str(rows)])
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": SEED,
+            "months": NUMBER_MONTHS,
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def compare(old, new, threshold=THRESHOLD, min_difference=MIN_DIFFERENCE):
+    # Returns the list of (rows, step, old seconds, new seconds) that became slower than threshold allows.
+    # A step must also be at least min_difference seconds slower: 0.1 ms -> 0.2 ms is 100%, but it is noise
+    regressions = []
+    for rows, steps in new["results"].items():
+        for step, seconds in steps.items():
+            before = old["results"].get(rows, {}).get(step)
+            if before and seconds > before * (1 + threshold) and seconds - before >= min_difference:
+                regressions.append((rows, step, before, seconds))
+    return regressions
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("python benchmark.py run results.json [max_rows] | compare old.json new.json")
+        return 1
+
+    command = sys.argv[1]
+    if command == "run":
+        max_rows = int(sys.argv[3]) if len(sys.argv) > 3 else 10**5
+        report = run([rows for rows in SIZES if rows <= max_rows])
+        with open(sys.argv[2], "w") as f:
+            json.dump(report, f, indent=2)
+    elif command == "compare":
+        with open(sys.argv[2], "r") as f:
+            old = json.load(f)
+        with open(sys.argv[3], "r") as f:
+            new = json.load(f)
+        regressions = compare(old, new)
+        for rows, step, before, after in regressions:
+            print(f"REGRESSION {rows:>10} {step:<25} {before:.6f}s -> {after:.6f}s")
+        if not regressions:
+            print("No regressions")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import sys
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+DATABASE = "salary.db"
+COLUMNAR_DIR = "columnar"
+TABLES = ("companies", "employees", "payments")
+BATCH_SIZE = 100_000
+
+
+"""
+SQLite stores data by rows: to count AVG(total) it reads every payments row with all its columns.
+A columnar format (Parquet) stores every column separately and compressed, so a report reads only
+the two or three columns it needs. pyarrow executes joins and aggregations over whole columns (vectorized),
+without creating a Python object for every row.
+
+Install: python -m pip install pyarrow
+"""
+
+
+def table_path(table, directory=COLUMNAR_DIR):
+    return os.path.join(directory, f"{table}.parquet")
+
+
+def arrow_type(declared_type):
+    # The type affinity rules of SQLite: the declared type of a column gives the type of its values
+    declared_type = declared_type.upper()
+    if "INT" in declared_type:
+        return pa.int64()
+    if any(name in declared_type for name in ("CHAR", "CLOB", "TEXT")):
+        return pa.string()
+    if any(name in declared_type for name in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    if "BLOB" in declared_type or not declared_type:
+        return pa.binary()
+    # NUMERIC affinity: DATE is stored by sqlite3 as the text "YYYY-MM-DD"
+    return pa.string()
+
+
+def table_schema(con, table):
+    # The schema is built once from the declared types: pa.array would guess the type of every batch
+    # separately, and a batch where a nullable column is all NULL would get another schema
+    return pa.schema([(row[1], arrow_type(row[2])) for row in con.execute(f"PRAGMA table_info({table})")])
+
+
+def export_table(con, table, directory=COLUMNAR_DIR, batch_size=BATCH_SIZE, compression="zstd"):
+    # The table is read by batches, so the whole table is never in memory as Python tuples
+    schema = table_schema(con, table)
+    cur = con.execute(f"SELECT {', '.join(schema.names)} FROM {table}")
+    rows = 0
+    # The writer is created before the first batch: an empty table gives an empty file with the schema
+    writer = pq.ParquetWriter(table_path(table, directory), schema, compression=compression)
+    try:
+        while batch := cur.fetchmany(batch_size):
+            record_batch = pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)], schema=schema
+            )
+            writer.write_batch(record_batch)
+            rows += len(batch)
+    finally:
+        writer.close()
+        cur.close()
+    return rows
+
+
+def export_db(db_file=DATABASE, directory=COLUMNAR_DIR, tables=TABLES):
+    # Snapshot of all the tables: {table: number of rows}
+    os.makedirs(directory, exist_ok=True)
+    with sqlite3.connect(db_file) as con:
+        result = {table: export_table(con, table, directory) for table in tables}
+    con.close()
+    return result
+
+
+def read_columns(table, columns, directory=COLUMNAR_DIR):
+    # Only the requested columns are read from the file
+    return pq.read_table(table_path(table, directory), columns=columns)
+
+
+def average_by_post(directory=COLUMNAR_DIR) -> list:
+    # The report of select_first.py
+    payments = read_columns("payments", ["employee_id", "total"], directory)
+    employees = read_columns("employees", ["id", "post"], directory)
+
+    result = (
+        payments.join(employees, keys="employee_id", right_keys="id", join_type="left outer")
+        .group_by("post")
+        .aggregate([("total", "mean")])
+        .sort_by("post")
+    )
+    averages = pc.round(result["total_mean"], 2)
+    return list(zip(averages.to_pylist(), result["post"].to_pylist()))
+
+
+def employees_by_company(directory=COLUMNAR_DIR) -> list:
+    # The report of select_second.py
+    employees = read_columns("employees", ["employee", "company_id"], directory)
+    companies = read_columns("companies", ["id", "company_name"], directory)
+    # the join drops the key of companies, so its id is kept in one more column
+    companies = companies.append_column("company", companies["id"])
+
+    # GROUP BY c.id: all the employees without a (known) company make one group with NULL.
+    # company_name is UNIQUE NOT NULL, so grouping by it is the same as grouping by c.id
+    result = (
+        employees.join(companies, keys="company_id", right_keys="id", join_type="left outer")
+        .group_by("company_name")
+        .aggregate([("employee", "count"), ("company", "min")])
+    )
+    # in the order of c.id, the NULL group first as in SQLite (the ids start with 1)
+    result = result.append_column("order", pc.fill_null(result["company_min"], 0)).sort_by("order")
+    return list(zip(result["employee_count"].to_pylist(), result["company_name"].to_pylist()))
+
+
+if __name__ == "__main__":
+    # python columnar.py export - make a snapshot of salary.db, without arguments - run the reports
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        print(export_db())
+    print(average_by_post())
+    print(employees_by_company())
+
+# {'companies': 3, 'employees': 30, 'payments': 360}
+# [(5096.42, 'Animal technologist'), (5514.54, 'Chief Marketing Officer'), (5546.54, 'Education officer, museum'),
+# (5895.53, 'Higher education lecturer'), (5259.98, 'Programmer, systems')]
+# [(9, 'Taylor, King and Ponce'), (15, 'Brown and Sons'), (6, 'Spencer-Wall')]
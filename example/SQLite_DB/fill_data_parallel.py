@@ -0,0 +1,134 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import faker
+
+from fill_data import (
+    NUMBER_COMPANIES,
+    NUMBER_EMPLOYEES,
+    NUMBER_MONTHS,
+    NUMBER_POST,
+    insert_data_streaming,
+)
+
+try:
+    import numpy as np
+except ImportError:  # the fast path is optional, without NumPy the payments are generated by random
+    np = None
+
+SEED = 42
+SHARD_SIZE = 10_000  # employees in one shard
+
+
+"""
+generate_fake_data creates everything in one process with one Faker. For millions of payments we split the
+employees into shards of SHARD_SIZE ids, and the shards are generated by a pool of processes. Each shard has
+its own seed (SEED + shard number). The shards depend only on the number of employees and SHARD_SIZE,
+not on the number of processes, so the same seed always gives the same database regardless of the number
+of cores (the NumPy path and the path without NumPy give different totals).
+
+Faker is needed only for the text columns (names, companies, posts). The numeric columns of payments
+(employee_id, total) are generated by NumPy with whole arrays at once - that is the vectorized fast path.
+"""
+
+
+def payment_dates(number_months, seed=SEED):
+    # As in prepare_data: all companies pay once a month between the 10th and the 20th
+    rnd = random.Random(seed)
+    return [
+        datetime(2021 + month // 12, month % 12 + 1, rnd.randint(10, 20)).date().isoformat()
+        for month in range(number_months)
+    ]
+
+
+def generate_shard(shard, first_id, last_id, posts, dates, seed=SEED, use_numpy=True):
+    """
+    Generate employees with ids from first_id to last_id inclusive and all their payments.
+    Employees are returned as a list of tuples, payments - as three columns (employee_id, date_of, total).
+    """
+    shard_seed = seed + shard
+    fake_data = faker.Faker()
+    fake_data.seed_instance(shard_seed)
+    rnd = random.Random(shard_seed)
+
+    employees = []
+    for emp_id in range(first_id, last_id + 1):
+        # The employee column is UNIQUE, and Faker repeats names on big volumes, so we add the id
+        employees.append(
+            (f"{fake_data.name()} {emp_id}", rnd.choice(posts), rnd.randint(1, NUMBER_COMPANIES))
+        )
+
+    number_employees = last_id - first_id + 1
+    number_payments = number_employees * len(dates)
+
+    if use_numpy and np is not None:
+        rng = np.random.default_rng(shard_seed)
+        # Month by month: every employee of the shard gets one payment per month
+        employee_ids = np.tile(np.arange(first_id, last_id + 1, dtype=np.int64), len(dates))
+        date_indexes = np.repeat(np.arange(len(dates), dtype=np.int32), number_employees)
+        totals = rng.integers(1000, 10000, size=number_payments, endpoint=True, dtype=np.int64)
+    else:
+        employee_ids = [emp_id for _ in dates for emp_id in range(first_id, last_id + 1)]
+        date_indexes = [index for index in range(len(dates)) for _ in range(number_employees)]
+        totals = [rnd.randint(1000, 10000) for _ in range(number_payments)]
+
+    return employees, (employee_ids, date_indexes, totals)
+
+
+def shard_ranges(number_employees, shard_size=SHARD_SIZE):
+    # Split ids 1..number_employees into ranges of shard_size ids, the last one can be shorter
+    for shard, first_id in enumerate(range(1, number_employees + 1, shard_size)):
+        yield shard, first_id, min(first_id + shard_size - 1, number_employees)
+
+
+def generate_fake_data_parallel(
+    number_companies,
+    number_employees,
+    number_post,
+    number_months=NUMBER_MONTHS,
+    workers=None,
+    seed=SEED,
+    use_numpy=True,
+    shard_size=SHARD_SIZE,
+):
+    """
+    Parallel version of generate_fake_data + prepare_data. Returns companies, a generator of employees
+    and a generator of payments - they can be passed directly to insert_data_streaming.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    fake_data = faker.Faker()
+    fake_data.seed_instance(seed)
+    companies = [(fake_data.unique.company(),) for _ in range(number_companies)]
+    posts = [fake_data.job() for _ in range(number_post)]
+    dates = payment_dates(number_months, seed)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(generate_shard, shard, first_id, last_id, posts, dates, seed, use_numpy)
+            for shard, first_id, last_id in shard_ranges(number_employees, shard_size)
+        ]
+        shards = [future.result() for future in futures]
+
+    def employees():
+        for shard_employees, _ in shards:
+            yield from shard_employees
+
+    def payments():
+        # The payments go month by month in every shard; tolist() turns NumPy numbers into Python int for sqlite3
+        for _, (employee_ids, date_indexes, totals) in shards:
+            if np is not None and isinstance(totals, np.ndarray):
+                employee_ids, date_indexes, totals = employee_ids.tolist(), date_indexes.tolist(), totals.tolist()
+            for emp_id, date_index, total in zip(employee_ids, date_indexes, totals):
+                yield emp_id, dates[date_index], total
+
+    return companies, employees(), payments()
+
+
+if __name__ == "__main__":
+    # The database must be recreated with create_db.py first
+    print(insert_data_streaming(*generate_fake_data_parallel(NUMBER_COMPANIES, NUMBER_EMPLOYEES, NUMBER_POST)))
+
+# {'rows': 393, 'seconds': 0.009, 'rows_per_sec': 43667}
@@ -0,0 +1,151 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from random import choice, randint
+
+from fill_data import NUMBER_COMPANIES, insert_data_streaming, generate_payments
+
+DATABASE = "salary.db"
+
+
+"""
+salary.sql creates only primary keys, so the queries from the select scripts read the whole tables.
+EXPLAIN QUERY PLAN shows how SQLite is going to execute a query: SCAN means reading the whole table,
+SEARCH means a lookup by an index. "USING COVERING INDEX" means that all the needed columns are in the index
+and SQLite does not read the table itself at all.
+"""
+
+# The reference queries of select_first.py, select_second.py and select_third.py
+QUERIES = {
+    "select_first": """
+    SELECT ROUND(AVG(p.total), 2) AS average_total, e.post
+    FROM payments AS p
+    LEFT JOIN employees AS e ON p.employee_id = e.id
+    GROUP BY e.post;
+    """,
+    "select_second": """
+    SELECT COUNT(*), c.company_name
+    FROM employees e
+    LEFT JOIN companies c ON e.company_id = c.id
+    GROUP BY c.id;
+    """,
+    "select_third": """
+    SELECT c.company_name, e.employee, e.post, p.total
+    FROM companies c
+        LEFT JOIN employees e ON e.company_id = c.id
+        LEFT JOIN payments p ON p.employee_id = e.id
+    WHERE p.total > 5000
+        AND  p.date_of BETWEEN  '2021-07-10' AND  '2021-07-20'
+    """,
+}
+
+# Covering indexes: the join column goes first, then the filter and the selected columns
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_payments_employee_date_total ON payments (employee_id, date_of, total);",
+    "CREATE INDEX IF NOT EXISTS idx_payments_date_total_employee ON payments (date_of, total, employee_id);",
+    "CREATE INDEX IF NOT EXISTS idx_employees_company ON employees (company_id, post, employee);",
+]
+
+
+def explain(con, sql):
+    # Every row of the plan is (id, parent, notused, detail), we only need the text
+    return [row[3] for row in con.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def full_scans(plan):
+    # A scan of a covering index is cheap - it is much smaller than the table.
+    # Note that AVG over the whole payments table (select_first) must read every row anyway - see summary tables
+    return [step for step in plan if step.startswith("SCAN") and "COVERING INDEX" not in step]
+
+
+def advise(con, queries=QUERIES):
+    report = {}
+    for name, sql in queries.items():
+        plan = explain(con, sql)
+        report[name] = {"plan": plan, "full_scans": full_scans(plan)}
+    return report
+
+
+def apply_indexes(con, indexes=INDEXES):
+    with con:
+        for index_sql in indexes:
+            con.execute(index_sql)
+    # ANALYZE collects statistics, and the planner chooses between the indexes better
+    con.execute("ANALYZE;")
+
+
+def time_queries(con, queries=QUERIES, repeat=3):
+    timings = {}
+    for name, sql in queries.items():
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            con.execute(sql).fetchall()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = round(best * 1000, 2)  # milliseconds
+    return timings
+
+
+def build_dataset(db_file, number_employees=10_000, number_months=120):
+    # The names do not matter for the timing, so we do not spend time on Faker here
+    with open("salary.sql", "r") as f:
+        sql = f.read()
+    with sqlite3.connect(db_file) as con:
+        con.executescript(sql)
+    con.close()
+
+    posts = [f"Post {i}" for i in range(1, 6)]
+    return insert_data_streaming(
+        ((f"Company {i}",) for i in range(1, NUMBER_COMPANIES + 1)),
+        ((f"Employee {i}", choice(posts), randint(1, NUMBER_COMPANIES)) for i in range(1, number_employees + 1)),
+        generate_payments(number_employees, number_months),
+        db_file=db_file,
+    )
+
+
+def print_report(report):
+    for name, result in report.items():
+        print(name)
+        for step in result["plan"]:
+            mark = "  !! " if step in result["full_scans"] else "     "
+            print(mark + step)
+
+
+def timing_report(number_employees=10_000, number_months=120):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "salary_large.db")
+        print("Dataset:", build_dataset(db_file, number_employees, number_months))
+
+        con = sqlite3.connect(db_file)
+        try:
+            before = time_queries(con)
+            apply_indexes(con)
+            after = time_queries(con)
+        finally:
+            con.close()
+
+    print(f"{'query':<15}{'before, ms':>12}{'after, ms':>12}")
+    for name in QUERIES:
+        print(f"{name:<15}{before[name]:>12}{after[name]:>12}")
+
+
+if __name__ == "__main__":
+    # python index_advisor.py          - show the plans and the full scans
+    # python index_advisor.py apply    - create the indexes in salary.db
+    # python index_advisor.py emit     - print the CREATE INDEX statements
+    # python index_advisor.py timing   - compare the queries before and after on a large generated database
+    command = sys.argv[1] if len(sys.argv) > 1 else "advise"
+
+    if command == "emit":
+        print("\n".join(INDEXES))
+    elif command == "timing":
+        timing_report()
+    else:
+        with sqlite3.connect(DATABASE) as con:
+            if command == "apply":
+                apply_indexes(con)
+            print_report(advise(con))
+        con.close()
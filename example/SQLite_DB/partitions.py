@@ -0,0 +1,162 @@
+import os
+import shutil
+import sqlite3
+from datetime import date
+from itertools import groupby
+
+DATABASE = "salary.db"
+PARTITIONS_DIR = "partitions"
+ARCHIVE_DIR = "archive"
+
+
+"""
+All the payments live in one table, and a query for July still works with the B-tree of the whole history.
+Here every month is stored in its own database file partitions/payments_YYYY_MM.db. The main salary.db keeps
+companies and employees, and a partition is connected to it with ATTACH only when a query needs it.
+
+The router takes the date range of a query and attaches only the months that overlap it (partition pruning).
+The attached partitions are joined into one TEMP view with UNION ALL (or copied into one TEMP table when there
+are more of them than SQLite can attach), and the query is executed once over it, so GROUP BY, AVG, ORDER BY
+and LIMIT work over the whole range, not month by month.
+Archiving an old month is moving its file to another directory - no DELETE of millions of rows.
+
+SQLite does not check FOREIGN KEY between different database files, so the partitions do not have it.
+"""
+
+PARTITION_TABLE = """
+CREATE TABLE IF NOT EXISTS payments (
+    id INTEGER PRIMARY KEY,
+    employee_id INTEGER,
+    date_of DATE NOT NULL,
+    total INTEGER NOT NULL
+);
+"""
+
+
+def to_date(value):
+    # sqlite3 returns DATE as a string "YYYY-MM-DD"
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def partition_path(year, month, directory=PARTITIONS_DIR):
+    return os.path.join(directory, f"payments_{year}_{month:02d}.db")
+
+
+def months_between(date_from, date_to):
+    # All (year, month) pairs from date_from to date_to inclusive
+    date_from, date_to = to_date(date_from), to_date(date_to)
+    year, month = date_from.year, date_from.month
+    while (year, month) <= (date_to.year, date_to.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def insert_payments(payments, directory=PARTITIONS_DIR):
+    """
+    Insert (id, employee_id, date_of, total) rows into the partitions of their months.
+    The rows are expected to be sorted by date - then every partition is opened only once.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rows = 0
+
+    for (year, month), month_payments in groupby(payments, key=lambda row: to_date(row[2]).timetuple()[:2]):
+        with sqlite3.connect(partition_path(year, month, directory)) as con:
+            con.execute(PARTITION_TABLE)
+            cur = con.executemany(
+                "INSERT INTO payments(id, employee_id, date_of, total) VALUES (?, ?, ?, ?)",
+                month_payments,
+            )
+            rows += cur.rowcount
+        con.close()
+
+    return rows
+
+
+def split_payments(db_file=DATABASE, directory=PARTITIONS_DIR):
+    # Copy the payments table of salary.db into monthly partitions. The other examples still read
+    # payments of salary.db, so it is not emptied; the partitions of its months are built again on every run
+    with sqlite3.connect(db_file) as con:
+        months = con.execute(
+            "SELECT DISTINCT CAST(strftime('%Y', date_of) AS INTEGER), CAST(strftime('%m', date_of) AS INTEGER)"
+            " FROM payments"
+        ).fetchall()
+        for year, month in months:
+            path = partition_path(year, month, directory)
+            if os.path.exists(path):
+                os.remove(path)
+        cur = con.execute("SELECT id, employee_id, date_of, total FROM payments ORDER BY date_of, id")
+        rows = insert_payments(cur, directory)
+    con.close()
+    return rows
+
+
+def query_partitions(sql, date_from, date_to, params=(), db_file=DATABASE, directory=PARTITIONS_DIR):
+    """
+    Execute sql over the partitions that overlap date_from..date_to and yield the rows.
+    In sql the payments table is written as {payments}, the router replaces it with payments_range:
+    a TEMP view of all the attached partitions. The number of attached databases in SQLite is limited
+    (10 by default), so for a longer range payments_range is a TEMP table: the partitions are attached
+    by groups and their rows are copied into it, then the query is executed once as well.
+    """
+    # A month without a file has no payments (or it has been archived)
+    paths = [partition_path(year, month, directory) for year, month in months_between(date_from, date_to)]
+    paths = [path for path in paths if os.path.exists(path)]
+    columns = "id, employee_id, date_of, total"
+
+    con = sqlite3.connect(db_file)
+    try:
+        limit = con.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if not paths:
+            con.execute(
+                "CREATE TEMP VIEW payments_range AS"
+                " SELECT NULL AS id, NULL AS employee_id, NULL AS date_of, NULL AS total WHERE 0"
+            )
+        elif len(paths) <= limit:
+            parts = []
+            for number, path in enumerate(paths):
+                con.execute(f"ATTACH DATABASE ? AS part{number}", (path,))
+                parts.append(f"SELECT {columns} FROM part{number}.payments")
+            con.execute(f"CREATE TEMP VIEW payments_range AS {' UNION ALL '.join(parts)}")
+        else:
+            con.execute(PARTITION_TABLE.replace("IF NOT EXISTS payments", "temp.payments_range"))
+            for first in range(0, len(paths), limit):
+                group = paths[first:first + limit]
+                for number, path in enumerate(group):
+                    con.execute(f"ATTACH DATABASE ? AS part{number}", (path,))
+                for number in range(len(group)):
+                    con.execute(f"INSERT INTO temp.payments_range SELECT {columns} FROM part{number}.payments")
+                con.commit()
+                for number in range(len(group)):
+                    con.execute(f"DETACH DATABASE part{number}")
+
+        yield from con.execute(sql.format(payments="payments_range"), params)
+    finally:
+        con.close()
+
+
+def archive_partition(year, month, directory=PARTITIONS_DIR, archive_directory=ARCHIVE_DIR):
+    # The whole month leaves the working set with one file move
+    os.makedirs(archive_directory, exist_ok=True)
+    path = partition_path(year, month, directory)
+    if not os.path.exists(path):
+        return None
+    return shutil.move(path, partition_path(year, month, archive_directory))
+
+
+if __name__ == "__main__":
+    print(split_payments())
+
+    # The query of select_third.py, but only the partition for July 2021 is read
+    sql = """
+    SELECT c.company_name, e.employee, e.post, p.total
+    FROM companies c
+        LEFT JOIN employees e ON e.company_id = c.id
+        LEFT JOIN {payments} p ON p.employee_id = e.id
+    WHERE p.total > ?
+        AND  p.date_of BETWEEN ? AND ?
+    """
+    date_from, date_to = "2021-07-10", "2021-07-20"
+    print(list(query_partitions(sql, date_from, date_to, (5000, date_from, date_to))))
+
+# 360
+# [('Taylor, King and Ponce', 'Anthony Jones', 'Higher education lecturer', 6833), ...]
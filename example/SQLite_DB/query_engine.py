@@ -0,0 +1,154 @@
+import sqlite3
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+from queue import Empty, Queue
+from threading import Lock
+
+DATABASE = "salary.db"
+POOL_SIZE = 4
+CACHED_STATEMENTS = 128
+ARRAYSIZE = 1000
+
+
+"""
+Opening sqlite3.connect for each query means reading the schema again and starting with a cold page cache.
+The pool keeps several connections open and gives them out in turn. Queue is thread-safe, so the pool
+can be shared between threads: a thread takes a connection, executes its query and returns it back.
+"""
+
+
+class ConnectionPool:
+    def __init__(self, db_file=DATABASE, size=POOL_SIZE, cached_statements=CACHED_STATEMENTS):
+        self.db_file = db_file
+        self.size = size
+        self.cached_statements = cached_statements
+        self._pool = Queue(maxsize=size)
+        self._created = 0
+        self._in_use = set()  # connections given out and not returned yet
+        self._retired = set()  # connections given out before close(), they are closed when returned
+        self._lock = Lock()
+
+    def _connect(self):
+        # check_same_thread=False - the connection is returned to the pool and can be taken by another thread.
+        # cached_statements - sqlite3 keeps this number of prepared statements per connection, the key is the SQL text
+        return sqlite3.connect(
+            self.db_file,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+
+    def acquire(self):
+        try:
+            con = self._pool.get_nowait()
+        except Empty:
+            # The connections are created lazily, no more than size pieces
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            # All connections are busy - wait until someone returns one
+            con = self._connect() if can_create else self._pool.get()
+        with self._lock:
+            self._in_use.add(con)
+        return con
+
+    def release(self, con):
+        # Do not give a connection with an unfinished transaction to the next user
+        if con.in_transaction:
+            con.rollback()
+        with self._lock:
+            self._in_use.discard(con)
+            retired = con in self._retired
+            self._retired.discard(con)
+        if retired:
+            # the pool has been closed since this connection was taken, there is no place for it in the queue
+            con.close()
+        else:
+            self._pool.put(con)
+
+    @contextmanager
+    def connection(self):
+        con = self.acquire()
+        try:
+            yield con
+        finally:
+            self.release(con)
+
+    def close(self):
+        # The free connections are closed now, the busy ones - when they are returned
+        with self._lock:
+            while True:
+                try:
+                    self._pool.get_nowait().close()
+                except Empty:
+                    break
+            self._retired.update(self._in_use)
+            self._in_use.clear()
+            self._created = 0
+
+
+_pools = {}
+_pools_lock = Lock()
+
+
+def get_pool(db_file=DATABASE) -> ConnectionPool:
+    # One shared pool for each database file
+    with _pools_lock:
+        if db_file not in _pools:
+            _pools[db_file] = ConnectionPool(db_file)
+        return _pools[db_file]
+
+
+def execute_query(sql: str, params=(), db_file=DATABASE) -> list:
+    with get_pool(db_file).connection() as con:
+        cur = con.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+
+"""
+fetchall creates a list with all the rows of the result. iterate_query reads the cursor by arraysize rows
+with fetchmany and yields them one by one, so only one batch is in memory whatever the size of the result.
+The connection is returned to the pool when the iteration is finished (or the generator is closed).
+"""
+
+
+@lru_cache(maxsize=None)
+def _record_class(columns):
+    # namedtuple has no __dict__ per row - a record takes as much memory as a plain tuple
+    return namedtuple("Record", columns, rename=True)
+
+
+def namedtuple_factory(cursor, row):
+    # Row factory for sqlite3: the fields are named after the columns of the query
+    columns = tuple(column[0] for column in cursor.description)
+    return _record_class(columns)(*row)
+
+
+def iterate_query(sql: str, params=(), arraysize=ARRAYSIZE, row_factory=None, db_file=DATABASE):
+    with get_pool(db_file).connection() as con:
+        cur = con.cursor()
+        cur.arraysize = arraysize
+        cur.row_factory = row_factory
+        try:
+            cur.execute(sql, params)
+            while rows := cur.fetchmany():
+                yield from rows
+        finally:
+            cur.close()
+
+
+if __name__ == "__main__":
+    sql = "SELECT COUNT(*) FROM payments;"
+
+    # The first call opens the connection, the following ones reuse it together with the prepared statement
+    for _ in range(3):
+        print(execute_query(sql))
+
+# [(360,)]
+# [(360,)]
+# [(360,)]
@@ -1,3 +1,8 @@
+-- The summary tables of summary_tables.py are built from payments, and their triggers are dropped
+-- together with payments, so they are dropped too (create them again with summary_tables.py)
+DROP TABLE IF EXISTS post_payments_summary;
+DROP TABLE IF EXISTS company_payments_summary;
+
 -- Table: companies
 DROP TABLE IF EXISTS companies;
 CREATE TABLE companies (
@@ -1,10 +1,4 @@
-import sqlite3
-
-def execute_query(sql: str) -> list:
-    with sqlite3.connect('salary.db') as con:
-        cur = con.cursor()
-        cur.execute(sql)
-        return cur.fetchall()
+from query_engine import execute_query
 
 sql = """
 SELECT ROUND(AVG(p.total), 2) AS average_total, e.post
@@ -13,7 +7,19 @@ LEFT JOIN employees AS e ON p.employee_id = e.id
 GROUP BY e.post;
 """
 
-print(execute_query(sql))
+# If summary_tables.py has been run, the same report is read from the summary table without scanning payments.
+# The table is up to date only while its triggers on payments exist (DROP TABLE payments removes them)
+sql_summary = """
+SELECT ROUND(CAST(total_sum AS REAL) / payments_count, 2) AS average_total, post
+FROM post_payments_summary
+ORDER BY post;
+"""
+
+has_summary = execute_query(
+    "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name = 'post_payments_summary_insert';"
+)
+
+print(execute_query(sql_summary if has_summary else sql))
 
 # average_total|post                     |
 # -------------+-------------------------+
@@ -1,12 +1,6 @@
 
 
-import sqlite3
-
-def execute_query(sql: str) -> list:
-    with sqlite3.connect('salary.db') as con:
-        cur = con.cursor()
-        cur.execute(sql)
-        return cur.fetchall()
+from query_engine import execute_query
 
 sql = """
 SELECT COUNT(*), c.company_name
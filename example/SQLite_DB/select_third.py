@@ -1,10 +1,4 @@
-import sqlite3
-
-def execute_query(sql: str) -> list:
-    with sqlite3.connect('salary.db') as con:
-        cur = con.cursor()
-        cur.execute(sql)
-        return cur.fetchall()
+from query_engine import iterate_query, namedtuple_factory
 
 sql = """
 SELECT c.company_name, e.employee, e.post, p.total
@@ -15,7 +9,12 @@ WHERE p.total > 5000
     AND  p.date_of BETWEEN  '2021-07-10' AND  '2021-07-20'
 """
 
-print(execute_query(sql))
+# The rows are read by batches and printed one by one instead of building the whole list with fetchall
+for row in iterate_query(sql, row_factory=namedtuple_factory):
+    print(row)
+
+# Record(company_name='Taylor, King and Ponce', employee='Anthony Jones', post='Higher education lecturer', total=6833)
+# ...
 
 # company_name          |employee          |post                     |total|
 # ----------------------+------------------+-------------------------+-----+
@@ -0,0 +1,164 @@
+import sqlite3
+
+DATABASE = "salary.db"
+
+
+"""
+select_first.py counts AVG over the whole payments table every time. Instead, we can keep the result ready:
+a summary table stores for every post (and for every company) the sum, the number, the minimum and the maximum
+of payments. Triggers on payments change only one row of the summary on each INSERT, UPDATE or DELETE,
+so the report reads a few rows instead of scanning millions.
+
+The sum and the number are changed by simple arithmetic. The minimum and the maximum cannot be "subtracted",
+so when the deleted value was the minimum or the maximum, it is recalculated for this one group only.
+
+If posts or companies of employees change, the summary must be rebuilt with refresh_summary.
+
+An employee may have no company (company_id is NULL), their payments make one group with NULL key.
+A UNIQUE column lets in any number of NULLs and "= NULL" is never true, so the groups are found with IS.
+"""
+
+# summary table -> the employees column by which the payments are grouped and its type
+DIMENSIONS = {
+    "post_payments_summary": ("post", "VARCHAR(120)"),
+    "company_payments_summary": ("company_id", "INTEGER"),
+}
+
+# not PRIMARY KEY: an INTEGER PRIMARY KEY is the rowid, and a NULL there becomes a new number
+SUMMARY_TABLE = """
+DROP TABLE IF EXISTS {table};
+CREATE TABLE {table} (
+    {column} {column_type} UNIQUE,
+    total_sum INTEGER NOT NULL,
+    payments_count INTEGER NOT NULL,
+    min_total INTEGER NOT NULL,
+    max_total INTEGER NOT NULL
+);
+"""
+
+# Add one payment (the NEW row) to its group: update the group, or create it if there is none.
+# (ON CONFLICT cannot be used: NULL keys never conflict)
+ADD_PAYMENT = """
+    UPDATE {table}
+    SET total_sum = total_sum + NEW.total,
+        payments_count = payments_count + 1,
+        min_total = MIN(min_total, NEW.total),
+        max_total = MAX(max_total, NEW.total)
+    WHERE {column} IS (SELECT {column} FROM employees WHERE id = NEW.employee_id)
+        AND EXISTS (SELECT 1 FROM employees WHERE id = NEW.employee_id);
+
+    INSERT INTO {table}({column}, total_sum, payments_count, min_total, max_total)
+    SELECT e.{column}, NEW.total, 1, NEW.total, NEW.total
+    FROM employees e
+    WHERE e.id = NEW.employee_id
+        AND NOT EXISTS (SELECT 1 FROM {table} s WHERE s.{column} IS e.{column});
+"""
+
+# Remove one payment (the OLD row) from its group
+REMOVE_PAYMENT = """
+    UPDATE {table}
+    SET total_sum = total_sum - OLD.total,
+        payments_count = payments_count - 1
+    WHERE {column} IS (SELECT {column} FROM employees WHERE id = OLD.employee_id)
+        AND EXISTS (SELECT 1 FROM employees WHERE id = OLD.employee_id);
+
+    UPDATE {table}
+    SET min_total = (
+            SELECT MIN(p.total) FROM payments p JOIN employees e ON p.employee_id = e.id
+            WHERE e.{column} IS {table}.{column}
+        ),
+        max_total = (
+            SELECT MAX(p.total) FROM payments p JOIN employees e ON p.employee_id = e.id
+            WHERE e.{column} IS {table}.{column}
+        )
+    WHERE {column} IS (SELECT {column} FROM employees WHERE id = OLD.employee_id)
+        AND EXISTS (SELECT 1 FROM employees WHERE id = OLD.employee_id)
+        AND payments_count > 0
+        AND (OLD.total = min_total OR OLD.total = max_total);
+
+    DELETE FROM {table} WHERE payments_count = 0;
+"""
+
+TRIGGERS = """
+DROP TRIGGER IF EXISTS {table}_insert;
+DROP TRIGGER IF EXISTS {table}_delete;
+DROP TRIGGER IF EXISTS {table}_update;
+
+CREATE TRIGGER {table}_insert AFTER INSERT ON payments
+BEGIN
+{add}
+END;
+
+CREATE TRIGGER {table}_delete AFTER DELETE ON payments
+BEGIN
+{remove}
+END;
+
+CREATE TRIGGER {table}_update AFTER UPDATE OF employee_id, total ON payments
+BEGIN
+{remove}
+{add}
+END;
+"""
+
+REFRESH = """
+BEGIN;
+DELETE FROM {table};
+INSERT INTO {table}({column}, total_sum, payments_count, min_total, max_total)
+SELECT e.{column}, SUM(p.total), COUNT(*), MIN(p.total), MAX(p.total)
+FROM payments p
+JOIN employees e ON p.employee_id = e.id
+GROUP BY e.{column};
+COMMIT;
+"""
+
+
+def create_summary(con):
+    # Create the summary tables with their triggers and fill them with the current payments
+    for table, (column, column_type) in DIMENSIONS.items():
+        add = ADD_PAYMENT.format(table=table, column=column)
+        remove = REMOVE_PAYMENT.format(table=table, column=column)
+        con.executescript(SUMMARY_TABLE.format(table=table, column=column, column_type=column_type))
+        con.executescript(TRIGGERS.format(table=table, add=add, remove=remove))
+    refresh_summary(con)
+
+
+def refresh_summary(con):
+    # Full recalculation in one transaction - needed only after changes in employees or for checking
+    for table, (column, _) in DIMENSIONS.items():
+        con.executescript(REFRESH.format(table=table, column=column))
+
+
+def average_by_post(con) -> list:
+    # The same result as the query in select_first.py, but read from the summary table
+    sql = """
+    SELECT ROUND(CAST(total_sum AS REAL) / payments_count, 2) AS average_total, post
+    FROM post_payments_summary
+    ORDER BY post;
+    """
+    return con.execute(sql).fetchall()
+
+
+def average_by_company(con) -> list:
+    sql = """
+    SELECT ROUND(CAST(s.total_sum AS REAL) / s.payments_count, 2) AS average_total, c.company_name
+    FROM company_payments_summary s
+    LEFT JOIN companies c ON s.company_id = c.id
+    ORDER BY c.id;
+    """
+    return con.execute(sql).fetchall()
+
+
+if __name__ == "__main__":
+    with sqlite3.connect(DATABASE) as con:
+        create_summary(con)
+        print(average_by_post(con))
+        print(average_by_company(con))
+    con.close()
+
+# [(5096.42, 'Animal technologist'),
+# (5514.54, 'Chief Marketing Officer'),
+# (5546.54, 'Education officer, museum'),
+# (5895.53, 'Higher education lecturer'),
+# (5259.98, 'Programmer, systems')]
+# [(5349.06, 'Taylor, King and Ponce'), (5556.12, 'Brown and Sons'), (5432.85, 'Spencer-Wall')]